@@ -4,8 +4,14 @@ import sys
 import os
 
 db_path = "data/golf_courses.db"
-conn = sqlite3.connect(db_path)
+# Read-only so stats can be taken while the scraper is writing
+conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
 conn.row_factory = sqlite3.Row
+conn.executescript("""
+    PRAGMA query_only=1;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA mmap_size=268435456;
+""")
 cursor = conn.cursor()
 
 print("=" * 60)
@@ -21,62 +27,26 @@ print(f"  Total courses scraped: {meta['total_courses_scraped']}")
 print(f"  Consecutive 404s: {meta['consecutive_404s']}")
 print(f"  Scraping complete: {bool(meta['scraping_complete'])}")
 
-# Courses count
-cursor.execute("SELECT COUNT(*) as count FROM courses")
-courses_count = cursor.fetchone()['count']
-print(f"\nCourses in database: {courses_count}")
-
-# Locations count
-cursor.execute("SELECT COUNT(*) as count FROM locations")
-locations_count = cursor.fetchone()['count']
-print(f"Locations: {locations_count}")
-
-# Tees count
-cursor.execute("SELECT COUNT(*) as count FROM tees")
-tees_count = cursor.fetchone()['count']
-print(f"Tees: {tees_count}")
-
-# Holes count
-cursor.execute("SELECT COUNT(*) as count FROM holes")
-holes_count = cursor.fetchone()['count']
-print(f"Holes: {holes_count}")
-
-# Scrape attempts
-cursor.execute("""
-    SELECT
-        COUNT(*) as total_attempts,
-        SUM(CASE WHEN success = 1 THEN 1 ELSE 0 END) as successful,
-        SUM(CASE WHEN success = 0 THEN 1 ELSE 0 END) as failed
-    FROM scrape_attempts
-""")
-attempts = cursor.fetchone()
-print(f"\nScrape Attempts:")
-print(f"  Total attempts: {attempts['total_attempts']}")
-print(f"  Successful: {attempts['successful']}")
-print(f"  Failed (404s): {attempts['failed']}")
-
-# Check for any holes with NULL values
-cursor.execute("""
-    SELECT COUNT(*) as count
-    FROM holes
-    WHERE par IS NULL OR yardage IS NULL OR handicap IS NULL
-""")
-null_holes = cursor.fetchone()['count']
-if null_holes > 0:
-    print(f"\nWARNING: Found {null_holes} holes with NULL values (par/yardage/handicap)")
+# Row counts maintained by triggers in the stats table. Databases the current
+# scraper hasn't opened yet have no stats table, so count directly instead.
+cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'stats'")
+if cursor.fetchone():
+    cursor.execute("SELECT key, value FROM stats")
+    counts = {row['key']: row['value'] for row in cursor.fetchall()}
+else:
     cursor.execute("""
-        SELECT DISTINCT c.id, c.club_name
-        FROM courses c
-        JOIN tees t ON t.course_id = c.id
-        JOIN holes h ON h.tee_id = t.id
-        WHERE h.par IS NULL OR h.yardage IS NULL OR h.handicap IS NULL
-        LIMIT 5
+        SELECT
+            (SELECT COUNT(*) FROM courses) as courses,
+            (SELECT COUNT(*) FROM scrape_attempts) as attempts,
+            (SELECT COALESCE(SUM(success), 0) FROM scrape_attempts) as successful_attempts
     """)
-    print("  Sample courses with incomplete hole data:")
-    for row in cursor.fetchall():
-        print(f"    - Course {row['id']}: {row['club_name']}")
-else:
-    print(f"\nSUCCESS: All holes have complete data")
+    counts = dict(cursor.fetchone())
+print(f"\nCourses in database: {counts['courses']}")
+
+print(f"\nScrape Attempts:")
+print(f"  Total attempts: {counts['attempts']}")
+print(f"  Successful: {counts['successful_attempts']}")
+print(f"  Failed (404s): {counts['attempts'] - counts['successful_attempts']}")
 
 # Sample courses
 print("\nSample courses (first 5):")
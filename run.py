@@ -10,7 +10,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 os.environ['DB_PATH'] = os.path.join(os.path.dirname(__file__), 'data', 'golf_courses.db')
 
 # Import and run
-from src.main import main
+from src.cli import main
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,60 @@
+"""Command-line interface for the Golf Course API scraper."""
+
+import argparse
+import os
+
+from .config import Config
+from .database import Database
+from .main import main as run_scraper
+
+
+def set_start_id(start_id):
+    """Set last_scraped_id so the scraper resumes from start_id."""
+    os.makedirs(os.path.dirname(Config.DB_PATH), exist_ok=True)
+
+    db = Database()
+    try:
+        db.update_scrape_metadata(
+            last_scraped_id=start_id - 1,
+            consecutive_404s=0
+        )
+
+        # Show updated metadata
+        metadata = db.get_scrape_metadata()
+        print("Updated scrape_metadata:")
+        print(f"  last_scraped_id: {metadata.last_scraped_id}")
+        print(f"  consecutive_404s: {metadata.consecutive_404s}")
+        print(f"  total_courses_scraped: {metadata.total_courses_scraped}")
+        print(f"\nScraper will resume from ID: {metadata.last_scraped_id + 1}")
+    finally:
+        db.close()
+
+
+def build_parser():
+    """Build the argument parser."""
+    parser = argparse.ArgumentParser(description="Golf Course API scraper")
+    subparsers = parser.add_subparsers(dest='command')
+
+    subparsers.add_parser('scrape', help="Run the scraper (default)")
+
+    start_parser = subparsers.add_parser(
+        'set-start-id',
+        help="Set the course ID the scraper resumes from"
+    )
+    start_parser.add_argument('start_id', type=int, help="Next course ID to scrape")
+
+    return parser
+
+
+def main(argv=None):
+    """CLI entry point."""
+    args = build_parser().parse_args(argv)
+
+    if args.command == 'set-start-id':
+        set_start_id(args.start_id)
+    else:
+        run_scraper()
+
+
+if __name__ == "__main__":
+    main()
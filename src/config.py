@@ -1,6 +1,8 @@
 """Configuration management for the Golf Course API scraper."""
 
 import os
+from types import MappingProxyType
+
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -14,18 +16,29 @@ class Config:
     API_KEY = os.getenv('GOLFCOURSEAPI_API_KEY')
     API_BASE_URL = os.getenv('API_BASE_URL', 'https://api.golfcourseapi.com')
     API_COURSE_ENDPOINT = '/v1/courses'
+    AUTH_HEADER = MappingProxyType({'Authorization': f'Key {API_KEY}'})
 
     # Rate Limiting (24-hour rolling window)
     # Default to 295 calls per day, but allow override from .env
     MAX_CALLS_PER_DAY = int(os.getenv('MAX_CALLS_PER_DAY', '295'))
     RATE_LIMIT_WINDOW_HOURS = 24
+    RATE_LIMIT_WINDOW_SECONDS = RATE_LIMIT_WINDOW_HOURS * 3600
+    RATE_LIMIT_FAST_PATH_RATIO = 0.9  # Below this share of the limit, skip the exact window count
+    API_CALL_CLEANUP_INTERVAL_SECONDS = 600  # Delete expired api_calls rows every 10 minutes
+    API_CALL_FLUSH_INTERVAL = 5  # Persist buffered API call timestamps every N calls (fits in the 5-call buffer)
 
     # Scraping Configuration
     CONSECUTIVE_404_LIMIT = int(os.getenv('CONSECUTIVE_404_LIMIT', '1000'))  # Stop after this many consecutive 404s
-    REQUEST_DELAY_SECONDS = 1.0  # Delay between requests to be respectful
+    CONCURRENT_REQUESTS = int(os.getenv('CONCURRENT_REQUESTS', '4'))  # Course fetches in flight at once
+    # Persist scrape progress and attempts every N IDs. Anything unsaved is re-fetched
+    # after a crash, so this bounds the quota lost to ~3% of a 295-call day.
+    PROGRESS_FLUSH_INTERVAL = 10
+    COURSE_FLUSH_INTERVAL = 5  # ...or sooner, once this many fetched courses are buffered
+    REQUEST_DELAY_SECONDS = 1.0  # Average spacing between requests to be respectful
 
     # Retry Configuration
-    RETRY_DELAY_SECONDS = 300  # 5 minutes
+    RETRY_DELAY_SECONDS = 300  # 5 minutes, doubled on each further attempt
+    RETRY_MAX_DELAY_SECONDS = 1800  # Cap on the backoff delay (30 minutes)
     RETRY_MAX_ATTEMPTS = 3
     RATE_LIMIT_SLEEP_SECONDS = 3600  # 1 hour if we hit 429
 
@@ -45,7 +58,10 @@ class Config:
         if cls.MAX_CALLS_PER_DAY <= 0:
             raise ValueError("MAX_CALLS_PER_DAY must be greater than 0")
 
+        if cls.CONCURRENT_REQUESTS <= 0:
+            raise ValueError("CONCURRENT_REQUESTS must be greater than 0")
+
     @classmethod
     def get_auth_header(cls):
         """Get the authorization header for API requests."""
-        return {'Authorization': f'Key {cls.API_KEY}'}
+        return cls.AUTH_HEADER
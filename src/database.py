@@ -1,15 +1,101 @@
 """Database management for the Golf Course API scraper."""
 
+import atexit
 import sqlite3
 import logging
-from datetime import datetime, timedelta
-from typing import Optional, Dict, List, Any
+import threading
+import time
+from collections import deque, namedtuple
+from pathlib import Path
+from typing import Optional, Dict, List, Set, Tuple, Any
 from contextlib import contextmanager
 
 from .config import Config
 
 logger = logging.getLogger(__name__)
 
+# Row of scrape_metadata, in _SQL_GET_METADATA column order
+ScrapeMetadata = namedtuple('ScrapeMetadata', [
+    'id',
+    'update_start_id',
+    'last_scraped_id',
+    'consecutive_404s',
+    'total_courses_scraped',
+    'scraping_complete',
+    'last_updated',
+    'created_at',
+])
+
+# Connection settings applied on every connect. WAL lets readers (e.g. check_data.py)
+# run alongside the scraper, and synchronous=NORMAL is durable enough under WAL.
+_PRAGMAS = '''
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-65536;
+    PRAGMA mmap_size=268435456;
+    PRAGMA foreign_keys=ON;
+'''
+
+# Hot-path SQL kept as constants so sqlite3's statement cache hits on identical text
+_SQL_RECORD_API_CALL = 'INSERT INTO api_calls (timestamp) VALUES (?)'
+_SQL_API_CALLS_IN_WINDOW = 'SELECT timestamp FROM api_calls WHERE timestamp > ? ORDER BY timestamp'
+_SQL_DELETE_OLD_API_CALLS = 'DELETE FROM api_calls WHERE timestamp <= ?'
+_SQL_IS_ATTEMPTED = 'SELECT 1 FROM scrape_attempts WHERE course_id = ?'
+_SQL_ATTEMPTED_IDS = 'SELECT course_id FROM scrape_attempts WHERE course_id >= ?'
+_SQL_RECORD_ATTEMPT = '''
+    INSERT INTO scrape_attempts (course_id, status_code, success, attempted_at)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(course_id) DO UPDATE SET
+        status_code = excluded.status_code,
+        success = excluded.success,
+        attempted_at = excluded.attempted_at
+'''
+_SQL_GET_METADATA = '''
+    SELECT id, update_start_id, last_scraped_id, consecutive_404s, total_courses_scraped,
+           scraping_complete, last_updated, created_at
+    FROM scrape_metadata WHERE id = 1
+'''
+_SQL_UPSERT_COURSE = '''
+    INSERT INTO courses
+    (id, club_name, course_name, address, city, state, country, latitude, longitude)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        club_name = excluded.club_name,
+        course_name = excluded.course_name,
+        address = excluded.address,
+        city = excluded.city,
+        state = excluded.state,
+        country = excluded.country,
+        latitude = excluded.latitude,
+        longitude = excluded.longitude
+'''
+_SQL_RECORD_PROGRESS = '''
+    UPDATE scrape_metadata
+    SET last_scraped_id = ?,
+        consecutive_404s = ?,
+        last_updated = ?
+    WHERE id = 1
+'''
+_SQL_BUMP_COURSES_SCRAPED = '''
+    UPDATE scrape_metadata
+    SET total_courses_scraped = total_courses_scraped + ?,
+        last_updated = ?
+    WHERE id = 1
+'''
+
+# Bumped whenever _migrate() gains a step; stored in PRAGMA user_version
+_SCHEMA_VERSION = 1
+
+# Columns of scrape_metadata that update_scrape_metadata may set
+_METADATA_COLUMNS = (
+    'update_start_id',
+    'last_scraped_id',
+    'consecutive_404s',
+    'total_courses_scraped',
+    'scraping_complete',
+)
+
 
 class Database:
     """SQLite database manager for golf course data."""
@@ -18,29 +104,71 @@ class Database:
         """Initialize database connection."""
         self.db_path = db_path or Config.DB_PATH
         self.conn = None
+        self._read_conn = None
+        # Serializes writes on self.conn and the in-memory API call window,
+        # which scraper worker threads update concurrently
+        self._lock = threading.RLock()
+        self._update_stmts: Dict[Tuple[str, ...], str] = {}
         self._connect()
         self._create_tables()
+        self._connect_reader()
+
+        # Rolling window of API call timestamps, oldest first. Calls are appended
+        # here immediately and persisted to api_calls in small batches.
+        self._api_calls = deque(self._load_api_calls_in_window())
+        self._pending_api_calls = []
+
+        # Expired rows are already ignored by window queries, so pruning runs
+        # on a background timer instead of in the request path
+        self._cleanup_timer = None
+        self._schedule_cleanup()
+
+        # Make sure buffered calls are written and expired rows pruned on exit
+        atexit.register(self.close)
 
     def _connect(self):
         """Connect to SQLite database."""
         try:
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            # Autocommit mode; transaction() issues BEGIN/COMMIT itself
+            self.conn = sqlite3.connect(
+                self.db_path, check_same_thread=False, isolation_level=None, cached_statements=256
+            )
             self.conn.row_factory = sqlite3.Row
+            self.conn.executescript(_PRAGMAS)
             logger.info(f"Connected to database: {self.db_path}")
         except sqlite3.Error as e:
             logger.error(f"Failed to connect to database: {e}")
             raise
 
+    def _connect_reader(self):
+        """Open a read-only connection so reads don't queue behind the writer (WAL)."""
+        if self.db_path == ':memory:':
+            # A second connection would see a different, empty database
+            self._read_conn = self.conn
+            return
+        try:
+            uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+            self._read_conn = sqlite3.connect(uri, uri=True, check_same_thread=False, cached_statements=256)
+            self._read_conn.row_factory = sqlite3.Row
+            self._read_conn.execute('PRAGMA query_only=1')
+        except sqlite3.Error as e:
+            logger.error(f"Failed to open read-only database connection: {e}")
+            raise
+
     @contextmanager
     def transaction(self):
         """Context manager for database transactions."""
-        try:
-            yield self.conn
-            self.conn.commit()
-        except Exception as e:
-            self.conn.rollback()
-            logger.error(f"Transaction failed, rolling back: {e}")
-            raise
+        with self._lock:
+            self.conn.execute('BEGIN')
+            try:
+                yield self.conn
+                self.conn.execute('COMMIT')
+            except BaseException as e:
+                # SQLite may already have rolled back on its own (e.g. SQLITE_FULL)
+                if self.conn.in_transaction:
+                    self.conn.execute('ROLLBACK')
+                logger.error(f"Transaction failed, rolling back: {e!r}")
+                raise
 
     def _create_tables(self):
         """Create database tables if they don't exist."""
@@ -56,7 +184,7 @@ class Database:
                     consecutive_404s INTEGER NOT NULL DEFAULT 0,
                     total_courses_scraped INTEGER NOT NULL DEFAULT 0,
                     scraping_complete BOOLEAN NOT NULL DEFAULT 0,
-                    last_updated TIMESTAMP NOT NULL,
+                    last_updated INTEGER NOT NULL,
                     created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
                 )
             ''')
@@ -65,7 +193,7 @@ class Database:
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS api_calls (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                    timestamp INTEGER NOT NULL
                 )
             ''')
 
@@ -81,7 +209,7 @@ class Database:
                     course_id INTEGER PRIMARY KEY,
                     status_code INTEGER NOT NULL,
                     success BOOLEAN NOT NULL,
-                    attempted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                    attempted_at INTEGER NOT NULL
                 )
             ''')
 
@@ -107,137 +235,319 @@ class Database:
                 )
             ''')
 
+            # Row counts kept current by triggers, so stats reads are single-row lookups
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS stats (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+
+            # Seed from existing rows the first time only; the triggers keep it current
+            cursor.execute('SELECT 1 FROM stats LIMIT 1')
+            if cursor.fetchone() is None:
+                cursor.execute('''
+                    INSERT INTO stats (key, value)
+                    SELECT 'courses', COUNT(*) FROM courses
+                    UNION ALL
+                    SELECT 'attempts', COUNT(*) FROM scrape_attempts
+                    UNION ALL
+                    SELECT 'successful_attempts', COALESCE(SUM(success), 0) FROM scrape_attempts
+                ''')
+
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_courses_insert_stats
+                AFTER INSERT ON courses
+                BEGIN
+                    UPDATE stats SET value = value + 1 WHERE key = 'courses';
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_courses_delete_stats
+                AFTER DELETE ON courses
+                BEGIN
+                    UPDATE stats SET value = value - 1 WHERE key = 'courses';
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_scrape_attempts_insert_stats
+                AFTER INSERT ON scrape_attempts
+                BEGIN
+                    UPDATE stats SET value = value + 1 WHERE key = 'attempts';
+                    UPDATE stats SET value = value + NEW.success WHERE key = 'successful_attempts';
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_scrape_attempts_update_stats
+                AFTER UPDATE OF success ON scrape_attempts
+                BEGIN
+                    UPDATE stats SET value = value + NEW.success - OLD.success
+                    WHERE key = 'successful_attempts';
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_scrape_attempts_delete_stats
+                AFTER DELETE ON scrape_attempts
+                BEGIN
+                    UPDATE stats SET value = value - 1 WHERE key = 'attempts';
+                    UPDATE stats SET value = value - OLD.success WHERE key = 'successful_attempts';
+                END
+            ''')
+
             # Initialize metadata if not exists
             cursor.execute('SELECT COUNT(*) FROM scrape_metadata')
             if cursor.fetchone()[0] == 0:
                 cursor.execute('''
                     INSERT INTO scrape_metadata (id, update_start_id, last_scraped_id, last_updated)
                     VALUES (1, 0, 0, ?)
-                ''', (datetime.now(),))
+                ''', (int(time.time()),))
                 logger.info("Initialized scrape_metadata table")
 
+            self._migrate(cursor)
+
         logger.info("Database tables created/verified")
 
-    def get_scrape_metadata(self) -> Dict[str, Any]:
+    def _migrate(self, cursor: sqlite3.Cursor):
+        """Bring tables created by older versions up to the current schema."""
+        cursor.execute('PRAGMA user_version')
+        version = cursor.fetchone()[0]
+        if version >= _SCHEMA_VERSION:
+            return
+
+        if version < 1:
+            # Timestamps used to be stored as text (local time for values bound from
+            # Python, UTC for CURRENT_TIMESTAMP defaults); convert them to Unix seconds
+            migrated = 0
+            cursor.execute('''
+                UPDATE api_calls
+                SET timestamp = CAST(strftime('%s', timestamp, 'utc') AS INTEGER)
+                WHERE typeof(timestamp) = 'text'
+            ''')
+            migrated += cursor.rowcount
+            cursor.execute('''
+                UPDATE scrape_metadata
+                SET last_updated = CAST(strftime('%s', last_updated, 'utc') AS INTEGER)
+                WHERE typeof(last_updated) = 'text'
+            ''')
+            migrated += cursor.rowcount
+            cursor.execute('''
+                UPDATE scrape_attempts
+                SET attempted_at = CAST(strftime('%s', attempted_at) AS INTEGER)
+                WHERE typeof(attempted_at) = 'text'
+            ''')
+            migrated += cursor.rowcount
+            if migrated:
+                logger.info("Migrated %d timestamp(s) to Unix seconds", migrated)
+
+        cursor.execute(f'PRAGMA user_version = {_SCHEMA_VERSION}')
+
+    def get_scrape_metadata(self) -> Optional[ScrapeMetadata]:
         """Get current scraping metadata."""
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM scrape_metadata WHERE id = 1')
+        cursor = self._read_conn.cursor()
+        cursor.execute(_SQL_GET_METADATA)
         row = cursor.fetchone()
-        return dict(row) if row else {}
+        return ScrapeMetadata._make(row) if row else None
 
     def update_scrape_metadata(self, **kwargs):
         """Update scraping metadata."""
-        with self.transaction():
-            cursor = self.conn.cursor()
-
-            # Build SET clause dynamically
-            set_clauses = []
-            values = []
-            for key, value in kwargs.items():
-                set_clauses.append(f"{key} = ?")
-                values.append(value)
-
+        unknown = set(kwargs) - set(_METADATA_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown scrape_metadata column(s): {', '.join(sorted(unknown))}")
+
+        # Fixed column order keeps the SQL text stable for the statement cache
+        columns = tuple(column for column in _METADATA_COLUMNS if column in kwargs)
+        query = self._update_stmts.get(columns)
+        if query is None:
             # Always update last_updated
+            set_clauses = [f"{column} = ?" for column in columns]
             set_clauses.append("last_updated = ?")
-            values.append(datetime.now())
-            values.append(1)  # WHERE id = 1
+            query = f"UPDATE scrape_metadata SET {', '.join(set_clauses)} WHERE id = 1"
+            self._update_stmts[columns] = query
+
+        values = [kwargs[column] for column in columns]
+        values.append(int(time.time()))
 
-            query = f"UPDATE scrape_metadata SET {', '.join(set_clauses)} WHERE id = ?"
+        with self.transaction():
+            cursor = self.conn.cursor()
             cursor.execute(query, values)
 
+    def _load_api_calls_in_window(self) -> List[int]:
+        """Load timestamps of persisted API calls still inside the window."""
+        cursor = self._read_conn.cursor()
+        window_start = int(time.time()) - Config.RATE_LIMIT_WINDOW_SECONDS
+        cursor.execute(_SQL_API_CALLS_IN_WINDOW, (window_start,))
+        return [row[0] for row in cursor]
+
+    def _trim_api_calls(self):
+        """Drop in-memory API call timestamps that have left the window."""
+        window_start = int(time.time()) - Config.RATE_LIMIT_WINDOW_SECONDS
+        with self._lock:
+            while self._api_calls and self._api_calls[0] <= window_start:
+                self._api_calls.popleft()
+
     def record_api_call(self):
         """Record an API call for rate limiting purposes."""
+        with self._lock:
+            now = int(time.time())
+            self._api_calls.append(now)
+            self._pending_api_calls.append((now,))
+            if len(self._pending_api_calls) >= Config.API_CALL_FLUSH_INTERVAL:
+                self.flush_api_calls()
+
+    def flush_api_calls(self):
+        """Persist buffered API call timestamps."""
         with self.transaction():
+            if not self._pending_api_calls:
+                return
             cursor = self.conn.cursor()
-            cursor.execute('INSERT INTO api_calls (timestamp) VALUES (?)', (datetime.now(),))
+            cursor.executemany(_SQL_RECORD_API_CALL, self._pending_api_calls)
+            self._pending_api_calls.clear()
 
     def get_api_calls_in_window(self) -> int:
         """Get count of API calls in the last 24 hours."""
-        cursor = self.conn.cursor()
-        window_start = datetime.now() - timedelta(hours=Config.RATE_LIMIT_WINDOW_HOURS)
-        cursor.execute('''
-            SELECT COUNT(*) FROM api_calls
-            WHERE timestamp > ?
-        ''', (window_start,))
-        return cursor.fetchone()[0]
+        # Expired entries only inflate the count, so while well under the limit
+        # the untrimmed length is a safe answer and the trim can be skipped
+        count = len(self._api_calls)
+        if count < Config.MAX_CALLS_PER_DAY * Config.RATE_LIMIT_FAST_PATH_RATIO:
+            return count
+        self._trim_api_calls()
+        return len(self._api_calls)
 
     def cleanup_old_api_calls(self):
         """Remove API call records older than 24 hours."""
+        self._trim_api_calls()
         with self.transaction():
             cursor = self.conn.cursor()
-            window_start = datetime.now() - timedelta(hours=Config.RATE_LIMIT_WINDOW_HOURS)
-            cursor.execute('DELETE FROM api_calls WHERE timestamp <= ?', (window_start,))
+            window_start = int(time.time()) - Config.RATE_LIMIT_WINDOW_SECONDS
+            cursor.execute(_SQL_DELETE_OLD_API_CALLS, (window_start,))
             deleted = cursor.rowcount
             if deleted > 0:
-                logger.debug(f"Cleaned up {deleted} old API call records")
-
-    def get_oldest_api_call_in_window(self) -> Optional[datetime]:
-        """Get timestamp of oldest API call in current window."""
-        cursor = self.conn.cursor()
-        window_start = datetime.now() - timedelta(hours=Config.RATE_LIMIT_WINDOW_HOURS)
-        cursor.execute('''
-            SELECT MIN(timestamp) FROM api_calls
-            WHERE timestamp > ?
-        ''', (window_start,))
-        result = cursor.fetchone()[0]
-        return datetime.fromisoformat(result) if result else None
+                logger.debug("Cleaned up %d old API call records", deleted)
+
+    def _schedule_cleanup(self):
+        """Arm the background timer for the next api_calls cleanup."""
+        self._cleanup_timer = threading.Timer(
+            Config.API_CALL_CLEANUP_INTERVAL_SECONDS, self._periodic_cleanup
+        )
+        self._cleanup_timer.daemon = True
+        self._cleanup_timer.start()
+
+    def _periodic_cleanup(self):
+        """Timer callback: prune expired api_calls rows and reschedule."""
+        with self._lock:
+            if self.conn is None:
+                return
+            try:
+                self.cleanup_old_api_calls()
+            except sqlite3.Error as e:
+                logger.error(f"Periodic API call cleanup failed: {e}")
+            self._schedule_cleanup()
+
+    def get_oldest_api_call_in_window(self) -> Optional[int]:
+        """Get timestamp (Unix seconds) of oldest API call in current window."""
+        self._trim_api_calls()
+        return self._api_calls[0] if self._api_calls else None
 
     def is_course_already_attempted(self, course_id: int) -> bool:
         """Check if a course ID has already been attempted."""
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT 1 FROM scrape_attempts WHERE course_id = ?', (course_id,))
+        cursor = self._read_conn.cursor()
+        cursor.execute(_SQL_IS_ATTEMPTED, (course_id,))
         return cursor.fetchone() is not None
 
+    def load_attempted_ids(self, min_id: int = 0) -> Set[int]:
+        """Load attempted course IDs greater than or equal to min_id."""
+        cursor = self._read_conn.cursor()
+        cursor.execute(_SQL_ATTEMPTED_IDS, (min_id,))
+        return {row[0] for row in cursor}
+
     def record_scrape_attempt(self, course_id: int, status_code: int, success: bool):
         """Record a scrape attempt (both successful and failed)."""
         with self.transaction():
             cursor = self.conn.cursor()
-            cursor.execute('''
-                INSERT OR REPLACE INTO scrape_attempts (course_id, status_code, success)
-                VALUES (?, ?, ?)
-            ''', (course_id, status_code, success))
+            cursor.execute(_SQL_RECORD_ATTEMPT, (course_id, status_code, success, int(time.time())))
+
+    @staticmethod
+    def _course_row(course_data: Dict[str, Any]) -> Tuple:
+        """Build the courses row for a course payload."""
+        course = course_data.get('course', {})
+        course_id = course.get('id')
+
+        if not course_id:
+            raise ValueError("Course data missing 'id'")
+
+        # Get location data
+        location = course.get('location', {})
+
+        # Course with inline location data
+        return (
+            course_id,
+            course.get('club_name', ''),
+            course.get('course_name', ''),
+            location.get('address'),
+            location.get('city'),
+            location.get('state'),
+            location.get('country'),
+            location.get('latitude'),
+            location.get('longitude')
+        )
 
     def save_course(self, course_data: Dict[str, Any]):
         """Save complete course data to database."""
         with self.transaction():
             cursor = self.conn.cursor()
+            cursor.execute(_SQL_UPSERT_COURSE, self._course_row(course_data))
 
-            course = course_data.get('course', {})
-            course_id = course.get('id')
-
-            if not course_id:
-                raise ValueError("Course data missing 'id'")
-
-            # Get location data
-            location = course.get('location', {})
+            # Update total courses scraped
+            cursor.execute(_SQL_BUMP_COURSES_SCRAPED, (1, int(time.time())))
 
-            # Insert course with inline location data
-            cursor.execute('''
-                INSERT OR REPLACE INTO courses
-                (id, club_name, course_name, address, city, state, country, latitude, longitude)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                course_id,
-                course.get('club_name', ''),
-                course.get('course_name', ''),
-                location.get('address'),
-                location.get('city'),
-                location.get('state'),
-                location.get('country'),
-                location.get('latitude'),
-                location.get('longitude')
-            ))
+    def finalize_success(self, course_id: int, course_data: Dict[str, Any]):
+        """Save a scraped course, its attempt, and the scraped-course count in one transaction."""
+        with self.transaction():
+            cursor = self.conn.cursor()
+            cursor.execute(_SQL_UPSERT_COURSE, self._course_row(course_data))
+            now = int(time.time())
+            cursor.execute(_SQL_RECORD_ATTEMPT, (course_id, 200, True, now))
+            cursor.execute(_SQL_BUMP_COURSES_SCRAPED, (1, now))
+
+    def save_scrape_batch(self, courses: List[Tuple[int, Dict[str, Any]]],
+                          failed_attempts: List[Tuple[int, int]],
+                          last_scraped_id: int, consecutive_404s: int):
+        """
+        Save a batch of scrape results in one transaction.
+
+        Writes the (course_id, course_data) courses with their successful attempts,
+        the failed (course_id, status_code) attempts, and the scrape progress.
+        """
+        course_rows = [self._course_row(course_data) for _, course_data in courses]
+        now = int(time.time())
+        attempt_rows = [(course_id, 200, True, now) for course_id, _ in courses]
+        attempt_rows.extend((course_id, status_code, False, now) for course_id, status_code in failed_attempts)
 
-            # Update total courses scraped
-            cursor.execute('''
-                UPDATE scrape_metadata
-                SET total_courses_scraped = total_courses_scraped + 1,
-                    last_updated = ?
-                WHERE id = 1
-            ''', (datetime.now(),))
+        with self.transaction():
+            cursor = self.conn.cursor()
+            if course_rows:
+                cursor.executemany(_SQL_UPSERT_COURSE, course_rows)
+                cursor.execute(_SQL_BUMP_COURSES_SCRAPED, (len(course_rows), now))
+            cursor.executemany(_SQL_RECORD_ATTEMPT, attempt_rows)
+            cursor.execute(_SQL_RECORD_PROGRESS, (last_scraped_id, consecutive_404s, now))
 
     def close(self):
         """Close database connection."""
-        if self.conn:
-            self.conn.close()
-            logger.info("Database connection closed")
+        # Nothing left to do at exit; also drops the hook's reference to this instance
+        atexit.unregister(self.close)
+
+        # Held throughout so a cleanup timer firing now can't reschedule itself
+        with self._lock:
+            if self._cleanup_timer:
+                self._cleanup_timer.cancel()
+                self._cleanup_timer = None
+            if self._read_conn:
+                if self._read_conn is not self.conn:
+                    self._read_conn.close()
+                self._read_conn = None
+            if self.conn:
+                self.flush_api_calls()
+                self.cleanup_old_api_calls()
+                self.conn.close()
+                self.conn = None
+                logger.info("Database connection closed")
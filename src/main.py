@@ -4,13 +4,14 @@ import logging
 import signal
 import sys
 import os
+import threading
 
 from .config import Config
 from .database import Database
 from .scraper import GolfCourseScraper
 
-# Global flag for graceful shutdown
-shutdown_requested = False
+# Set by the signal handler; the scraper checks it between requests
+SHUTDOWN = threading.Event()
 
 
 def setup_logging():
@@ -27,11 +28,10 @@ def setup_logging():
 
 def signal_handler(signum, frame):
     """Handle shutdown signals gracefully."""
-    global shutdown_requested
     signal_name = signal.Signals(signum).name
     logger = logging.getLogger(__name__)
     logger.info(f"Received {signal_name} signal. Initiating graceful shutdown...")
-    shutdown_requested = True
+    SHUTDOWN.set()
 
 
 def main():
@@ -69,24 +69,27 @@ def main():
         db = Database()
 
         metadata = db.get_scrape_metadata()
-        logger.info(f"Last scraped ID: {metadata.get('last_scraped_id', 0)}")
-        logger.info(f"Total courses in database: {metadata.get('total_courses_scraped', 0)}")
-        logger.info(f"Scraping complete: {metadata.get('scraping_complete', False)}")
+        logger.info(f"Last scraped ID: {metadata.last_scraped_id}")
+        logger.info(f"Total courses in database: {metadata.total_courses_scraped}")
+        logger.info(f"Scraping complete: {metadata.scraping_complete}")
 
         # Check if already complete
-        if metadata.get('scraping_complete'):
+        if metadata.scraping_complete:
             logger.info("Scraping already marked as complete.")
             logger.info("To restart scraping, update the scrape_metadata table in the database.")
             return
 
         # Initialize scraper
         logger.info("Starting scraper...")
-        scraper = GolfCourseScraper(db)
+        scraper = GolfCourseScraper(db, shutdown_event=SHUTDOWN)
 
         # Run scraper
         scraper.scrape()
 
-        logger.info("Scraping completed successfully")
+        if SHUTDOWN.is_set():
+            logger.info("Scraper stopped before completion")
+        else:
+            logger.info("Scraping completed successfully")
 
     except KeyboardInterrupt:
         logger.info("Interrupted by user")
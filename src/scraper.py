@@ -1,12 +1,19 @@
 """Golf Course API scraper with rate limiting and retry logic."""
 
 import logging
+import random
+import threading
 import time
-from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, List, Tuple, Any
 
+import orjson
 import requests
-from requests.exceptions import RequestException
+from requests.adapters import HTTPAdapter
+from requests.exceptions import InvalidJSONError, RequestException
 
 from .config import Config
 from .database import Database
@@ -14,38 +21,136 @@ from .database import Database
 logger = logging.getLogger(__name__)
 
 
+class ScrapeStopped(Exception):
+    """Raised by fetch_course when shutdown interrupts a fetch before it has a result."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter."""
+
+    def __init__(self, rate: float, capacity: int):
+        """Allow `rate` acquisitions per second on average, with bursts of up to `capacity`."""
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, stop_event: Optional[threading.Event] = None) -> bool:
+        """Take a token, sleeping only if none is available.
+
+        Returns False if stop_event is set while waiting for the token.
+        """
+        if self.rate == float('inf'):
+            return True
+
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            # Reserve a token; a negative balance queues later callers behind this one
+            self.tokens -= 1
+            wait_seconds = -self.tokens / self.rate if self.tokens < 0 else 0
+
+        if wait_seconds > 0:
+            if stop_event is not None:
+                return not stop_event.wait(wait_seconds)
+            time.sleep(wait_seconds)
+        return True
+
+
 class GolfCourseScraper:
     """Scraper for the Golf Course API."""
 
-    def __init__(self, database: Database):
+    def __init__(self, database: Database, shutdown_event: Optional[threading.Event] = None):
         """Initialize the scraper."""
         self.db = database
+        self.shutdown_event = shutdown_event or threading.Event()
         self.session = requests.Session()
         self.session.headers.update(Config.get_auth_header())
 
+        # One pooled keep-alive connection per worker; retries are handled in fetch_course
+        adapter = HTTPAdapter(
+            pool_connections=Config.CONCURRENT_REQUESTS,
+            pool_maxsize=Config.CONCURRENT_REQUESTS,
+            max_retries=0
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._attempted_ids = set()
+
+        # Paces individual requests (including retries) across all workers
+        request_rate = 1 / Config.REQUEST_DELAY_SECONDS if Config.REQUEST_DELAY_SECONDS > 0 else float('inf')
+        self.bucket = TokenBucket(request_rate, Config.CONCURRENT_REQUESTS)
+
+        # Fetched courses, failed attempts and scrape progress
+        # (last_scraped_id, consecutive_404s) not yet written to the database
+        self._pending_courses: List[Tuple[int, Dict[str, Any]]] = []
+        self._pending_failures: List[Tuple[int, int]] = []
+        self._pending_progress: Optional[Tuple[int, int]] = None
+        self._ids_since_flush = 0
+
+    @staticmethod
+    def _backoff_delay(attempt: int) -> float:
+        """Exponential backoff for the given attempt number, with up to 10% random jitter."""
+        delay = min(Config.RETRY_DELAY_SECONDS * 2 ** (attempt - 1), Config.RETRY_MAX_DELAY_SECONDS)
+        return delay + random.uniform(0, delay * 0.1)
+
+    @staticmethod
+    def _retry_after_seconds(response: requests.Response) -> Optional[float]:
+        """Parse a Retry-After header (seconds or HTTP date), if present and valid."""
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, retry_at.timestamp() - time.time())
+
+    def _wait_before_retry(self, course_id: int, wait_time: float):
+        """Sleep before a retry, giving up on the fetch if shutdown is requested meanwhile."""
+        if self.shutdown_event.wait(wait_time):
+            raise ScrapeStopped(course_id)
+
     def fetch_course(self, course_id: int) -> Optional[Dict[str, Any]]:
         """
         Fetch course data from API.
 
         Returns:
-            Course data dict if successful, None if 404, raises exception for other errors
+            Course data dict if successful, None if 404, raises exception for other errors.
+            Raises ScrapeStopped if shutdown is requested first, so the ID isn't recorded.
         """
         url = f"{Config.API_BASE_URL}{Config.API_COURSE_ENDPOINT}/{course_id}"
 
         for attempt in range(1, Config.RETRY_MAX_ATTEMPTS + 1):
+            if self.shutdown_event.is_set():
+                raise ScrapeStopped(course_id)
+
             try:
-                logger.debug(f"Fetching course {course_id} (attempt {attempt}/{Config.RETRY_MAX_ATTEMPTS})")
+                logger.debug("Fetching course %d (attempt %d/%d)", course_id, attempt, Config.RETRY_MAX_ATTEMPTS)
 
+                if not self.bucket.acquire(self.shutdown_event):
+                    raise ScrapeStopped(course_id)
                 response = self.session.get(url, timeout=30)
 
                 # Record API call for rate limiting
                 self.db.record_api_call()
 
                 if response.status_code == 200:
-                    return response.json()
+                    try:
+                        return orjson.loads(response.content)
+                    except ValueError as e:
+                        # Surface as a request error so it is retried like one
+                        raise InvalidJSONError(f"Invalid JSON for course {course_id}: {e}", response=response) from e
 
                 elif response.status_code == 404:
-                    logger.debug(f"Course {course_id} not found (404)")
+                    logger.debug("Course %d not found (404)", course_id)
                     return None
 
                 elif response.status_code == 401:
@@ -53,68 +158,143 @@ class GolfCourseScraper:
                     raise ValueError("Invalid API key")
 
                 elif response.status_code == 429:
-                    logger.warning(f"Rate limit hit (429) for course {course_id}")
-                    logger.info(f"Sleeping {Config.RATE_LIMIT_SLEEP_SECONDS} seconds...")
-                    time.sleep(Config.RATE_LIMIT_SLEEP_SECONDS)
+                    logger.warning("Rate limit hit (429) for course %d", course_id)
+                    retry_after = self._retry_after_seconds(response)
+                    wait_time = Config.RATE_LIMIT_SLEEP_SECONDS if retry_after is None else retry_after
+                    wait_time += random.uniform(0, 1)  # Keep workers from retrying in lockstep
+                    logger.info("Sleeping %d seconds...", wait_time)
+                    self._wait_before_retry(course_id, wait_time)
                     continue  # Retry same ID
 
                 else:
-                    logger.warning(f"Unexpected status {response.status_code} for course {course_id}")
+                    logger.warning("Unexpected status %d for course %d", response.status_code, course_id)
                     if attempt < Config.RETRY_MAX_ATTEMPTS:
-                        wait_time = Config.RETRY_DELAY_SECONDS * attempt
-                        logger.info(f"Waiting {wait_time} seconds before retry...")
-                        time.sleep(wait_time)
+                        wait_time = self._backoff_delay(attempt)
+                        logger.info("Waiting %d seconds before retry...", wait_time)
+                        self._wait_before_retry(course_id, wait_time)
                         continue
                     else:
-                        logger.error(f"Max retries exceeded for course {course_id}")
+                        logger.error("Max retries exceeded for course %d", course_id)
                         return None
 
             except RequestException as e:
-                logger.error(f"Network error fetching course {course_id}: {e}")
+                logger.error("Network error fetching course %d: %s", course_id, e)
                 if attempt < Config.RETRY_MAX_ATTEMPTS:
-                    wait_time = Config.RETRY_DELAY_SECONDS * attempt
-                    logger.info(f"Waiting {wait_time} seconds before retry...")
-                    time.sleep(wait_time)
+                    wait_time = self._backoff_delay(attempt)
+                    logger.info("Waiting %d seconds before retry...", wait_time)
+                    self._wait_before_retry(course_id, wait_time)
                 else:
-                    logger.error(f"Max retries exceeded for course {course_id}")
+                    logger.error("Max retries exceeded for course %d", course_id)
                     return None
 
         return None
 
-    def check_rate_limit(self) -> bool:
-        """
-        Check if we're within rate limit.
-
-        Returns:
-            True if we can make more calls, False if limit reached
-        """
-        calls_in_window = self.db.get_api_calls_in_window()
-        return calls_in_window < Config.MAX_CALLS_PER_DAY
-
     def wait_for_rate_limit_window(self):
         """Wait until we can make more API calls."""
         oldest_call = self.db.get_oldest_api_call_in_window()
 
         if oldest_call:
             # Calculate when the oldest call will drop out of the 24-hour window
-            window_reset_time = oldest_call + timedelta(hours=Config.RATE_LIMIT_WINDOW_HOURS)
-            now = datetime.now()
+            window_reset_time = oldest_call + Config.RATE_LIMIT_WINDOW_SECONDS
+            now = time.time()
 
             if window_reset_time > now:
-                wait_seconds = (window_reset_time - now).total_seconds()
+                wait_seconds = window_reset_time - now
+                reset_at = datetime.fromtimestamp(window_reset_time)
                 logger.info(
-                    f"Rate limit reached ({Config.MAX_CALLS_PER_DAY} calls in 24 hours). "
-                    f"Sleeping until {window_reset_time.strftime('%Y-%m-%d %H:%M:%S')} "
-                    f"({int(wait_seconds)} seconds)..."
+                    "Rate limit reached (%d calls in 24 hours). Sleeping until %s (%d seconds)...",
+                    Config.MAX_CALLS_PER_DAY, reset_at.strftime('%Y-%m-%d %H:%M:%S'), wait_seconds
                 )
-                time.sleep(wait_seconds + 1)  # Add 1 second buffer
+                self.shutdown_event.wait(wait_seconds + 1)  # Add 1 second buffer
             else:
                 # Clean up old records
                 self.db.cleanup_old_api_calls()
         else:
             # No calls in window, wait a bit and continue
             logger.warning("Rate limit triggered but no calls in window. Waiting 60 seconds...")
-            time.sleep(60)
+            self.shutdown_event.wait(60)
+
+    def _next_unattempted_id(self, course_id: int) -> int:
+        """Return the first course ID at or after course_id that hasn't been attempted."""
+        while course_id in self._attempted_ids:
+            logger.debug("Course ID %d already attempted, skipping...", course_id)
+            course_id += 1
+        return course_id
+
+    def _flush_progress(self):
+        """Write buffered courses, attempts and scrape progress in one transaction."""
+        if self._pending_progress is None:
+            return
+        last_scraped_id, consecutive_404s = self._pending_progress
+
+        try:
+            self.db.save_scrape_batch(self._pending_courses, self._pending_failures,
+                                      last_scraped_id, consecutive_404s)
+            if self._pending_courses:
+                logger.info("Saved %d course(s) to database", len(self._pending_courses))
+        except Exception as e:
+            if not self._pending_courses:
+                raise
+            # Find the offending course(s) by saving one at a time. Each one is either
+            # committed or turned into a failure here, so drop them from the buffer
+            # up front; only failures and progress are retried if the final save fails.
+            logger.error("Failed to save course batch, retrying individually: %s", e)
+            courses, self._pending_courses = self._pending_courses, []
+            for course_id, course_data in courses:
+                try:
+                    self.db.finalize_success(course_id, course_data)
+                    logger.info("Saved course %d to database", course_id)
+                except Exception as e:
+                    logger.error("Failed to save course %d: %s", course_id, e)
+                    # Record failed save attempt
+                    self._pending_failures.append((course_id, 200))
+            self.db.save_scrape_batch([], self._pending_failures, last_scraped_id, consecutive_404s)
+
+        self._pending_courses.clear()
+        self._pending_failures.clear()
+        self._pending_progress = None
+        self._ids_since_flush = 0
+
+    def _process_result(self, course_id: int, course_data: Optional[Dict[str, Any]],
+                        consecutive_404s: int) -> int:
+        """Persist the outcome of one fetch and return the updated consecutive 404 count."""
+        if course_data:
+            # Successfully fetched course
+            if logger.isEnabledFor(logging.INFO):
+                course = course_data.get('course', {})
+                logger.info(
+                    "Successfully scraped course %d: %s - %s", course_id,
+                    course.get('club_name', 'Unknown'), course.get('course_name', 'Unknown')
+                )
+
+            # Saved with the next batch
+            self._pending_courses.append((course_id, course_data))
+
+            # Reset consecutive 404s
+            consecutive_404s = 0
+
+        else:
+            # Got 404 or error
+            consecutive_404s += 1
+            logger.warning(
+                "Received 404 for course ID %d (consecutive 404s: %d/%d)",
+                course_id, consecutive_404s, Config.CONSECUTIVE_404_LIMIT
+            )
+
+            # Record 404 attempt
+            self._pending_failures.append((course_id, 404))
+
+        self._attempted_ids.add(course_id)
+
+        # Results are only persisted periodically; on a crash the unsaved IDs are
+        # simply fetched again
+        self._pending_progress = (course_id, consecutive_404s)
+        self._ids_since_flush += 1
+        if (self._ids_since_flush >= Config.PROGRESS_FLUSH_INTERVAL
+                or len(self._pending_courses) >= Config.COURSE_FLUSH_INTERVAL):
+            self._flush_progress()
+
+        return consecutive_404s
 
     def scrape(self):
         """Main scraping loop."""
@@ -123,97 +303,100 @@ class GolfCourseScraper:
         # Get current metadata
         metadata = self.db.get_scrape_metadata()
 
-        if metadata.get('scraping_complete'):
+        if metadata.scraping_complete:
             logger.info("Scraping already complete. Exiting.")
-            logger.info(f"Total courses scraped: {metadata.get('total_courses_scraped', 0)}")
+            logger.info("Total courses scraped: %d", metadata.total_courses_scraped)
             return
 
         # Resume from last position
-        current_id = metadata.get('last_scraped_id', 0) + 1
-        consecutive_404s = metadata.get('consecutive_404s', 0)
-
-        logger.info(f"Resuming from course ID: {current_id}")
-        logger.info(f"Consecutive 404s: {consecutive_404s}/{Config.CONSECUTIVE_404_LIMIT}")
-
-        while consecutive_404s < Config.CONSECUTIVE_404_LIMIT:
-            # Skip if already attempted
-            if self.db.is_course_already_attempted(current_id):
-                logger.debug(f"Course ID {current_id} already attempted, skipping...")
-                current_id += 1
-                continue
-
-            # Check rate limit
-            if not self.check_rate_limit():
-                calls_in_window = self.db.get_api_calls_in_window()
-                logger.warning(f"Rate limit reached: {calls_in_window}/{Config.MAX_CALLS_PER_DAY} calls")
-                self.wait_for_rate_limit_window()
-                # Clean up old records after waiting
-                self.db.cleanup_old_api_calls()
-
-            # Fetch course
-            logger.debug(f"Attempting to fetch course ID: {current_id}")
-            course_data = self.fetch_course(current_id)
-
-            if course_data:
-                # Successfully fetched course
-                course = course_data.get('course', {})
-                club_name = course.get('club_name', 'Unknown')
-                course_name = course.get('course_name', 'Unknown')
-
-                logger.info(f"Successfully scraped course {current_id}: {club_name} - {course_name}")
-
-                # Save to database
-                try:
-                    self.db.save_course(course_data)
-                    # Record successful attempt
-                    self.db.record_scrape_attempt(current_id, 200, True)
-                    logger.info(f"Saved course {current_id} to database")
-                except Exception as e:
-                    logger.error(f"Failed to save course {current_id}: {e}")
-                    # Record failed save attempt
-                    self.db.record_scrape_attempt(current_id, 200, False)
-                    # Continue to next course even if save fails
-
-                # Reset consecutive 404s
-                consecutive_404s = 0
-                self.db.update_scrape_metadata(
-                    last_scraped_id=current_id,
-                    consecutive_404s=0
-                )
-
-            else:
-                # Got 404 or error
-                # Record 404 attempt
-                self.db.record_scrape_attempt(current_id, 404, False)
-
-                consecutive_404s += 1
-                logger.warning(
-                    f"Received 404 for course ID {current_id} "
-                    f"(consecutive 404s: {consecutive_404s}/{Config.CONSECUTIVE_404_LIMIT})"
-                )
-
-                self.db.update_scrape_metadata(
-                    last_scraped_id=current_id,
-                    consecutive_404s=consecutive_404s
-                )
-
-            # Move to next ID
-            current_id += 1
-
-            # Respectful delay between requests
-            time.sleep(Config.REQUEST_DELAY_SECONDS)
+        current_id = metadata.last_scraped_id + 1
+        consecutive_404s = metadata.consecutive_404s
+
+        logger.info("Resuming from course ID: %d", current_id)
+        logger.info("Consecutive 404s: %d/%d", consecutive_404s, Config.CONSECUTIVE_404_LIMIT)
+
+        # Load attempted IDs ahead of the resume point once, so the loop can skip
+        # them without a query per ID (IDs behind it are never revisited)
+        self._attempted_ids = self.db.load_attempted_ids(current_id)
+        logger.info("Previously attempted course IDs ahead: %d", len(self._attempted_ids))
+
+        # Sliding window of (course_id, future) fetches in ID order. Results are
+        # handled in that order, so only a contiguous run of 404s counts toward
+        # termination, while the gaps themselves are fetched in parallel.
+        in_flight = deque()
+        next_id = current_id
+        flushed_on_stop = False
+
+        try:
+            with ThreadPoolExecutor(max_workers=Config.CONCURRENT_REQUESTS) as executor:
+                while True:
+                    stopping = (self.shutdown_event.is_set()
+                                or consecutive_404s >= Config.CONSECUTIVE_404_LIMIT)
+
+                    if stopping and not flushed_on_stop:
+                        # Save finished work before draining, which can outlast
+                        # the grace period before the process is killed
+                        self._flush_progress()
+                        flushed_on_stop = True
+
+                    # Top up the window within the rate limit, counting in-flight calls.
+                    # Near the 404 limit, only keep as many fetches in flight as could
+                    # still be needed if every one of them comes back 404.
+                    if not stopping:
+                        calls_in_window = self.db.get_api_calls_in_window()
+                        budget = Config.MAX_CALLS_PER_DAY - calls_in_window - len(in_flight)
+                        while (len(in_flight) < Config.CONCURRENT_REQUESTS and budget > 0
+                               and consecutive_404s + len(in_flight) < Config.CONSECUTIVE_404_LIMIT):
+                            next_id = self._next_unattempted_id(next_id)
+                            logger.debug("Attempting to fetch course ID: %d", next_id)
+                            in_flight.append((next_id, executor.submit(self.fetch_course, next_id)))
+                            next_id += 1
+                            budget -= 1
+
+                    if consecutive_404s >= Config.CONSECUTIVE_404_LIMIT:
+                        # Anything still in flight is past the end of the ID range
+                        for _, pending in in_flight:
+                            pending.cancel()
+                        in_flight.clear()
+                        break
+
+                    if not in_flight:
+                        if stopping:
+                            break
+
+                        logger.warning("Rate limit reached: %d/%d calls", calls_in_window, Config.MAX_CALLS_PER_DAY)
+                        # Persist progress before a potentially long wait
+                        self._flush_progress()
+                        self.wait_for_rate_limit_window()
+                        continue
 
-            # Periodic cleanup of old API call records (every 100 requests)
-            if current_id % 100 == 0:
-                self.db.cleanup_old_api_calls()
+                    # Handle the oldest fetch; drains the window once stopping
+                    course_id, future = in_flight.popleft()
+                    try:
+                        course_data = future.result()
+                    except ScrapeStopped:
+                        # Results are handled in ID order, so this ID and everything
+                        # after it is left unrecorded to be fetched on the next run
+                        for _, pending in in_flight:
+                            pending.cancel()
+                        in_flight.clear()
+                        next_id = course_id
+                        break
+                    consecutive_404s = self._process_result(course_id, course_data, consecutive_404s)
+        finally:
+            self._flush_progress()
+
+        if consecutive_404s < Config.CONSECUTIVE_404_LIMIT:
+            logger.info("Shutdown requested. Stopped before course ID %d.", next_id)
+            return
 
         # Scraping complete
-        logger.info(f"Reached {Config.CONSECUTIVE_404_LIMIT} consecutive 404s. Scraping complete!")
+        logger.info("Reached %d consecutive 404s. Scraping complete!", Config.CONSECUTIVE_404_LIMIT)
 
         metadata = self.db.get_scrape_metadata()
-        total_courses = metadata.get('total_courses_scraped', 0)
+        total_courses = metadata.total_courses_scraped
 
         self.db.update_scrape_metadata(scraping_complete=True)
 
-        logger.info(f"Total courses scraped: {total_courses}")
+        logger.info("Total courses scraped: %d", total_courses)
         logger.info("Scraper finished successfully.")